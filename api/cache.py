@@ -0,0 +1,53 @@
+# Response cache for fully static endpoints (health, stats, categories).
+# Two tiers: an in-process dict (L1, a hit is just a dict lookup) in front of
+# Redis (shared across workers) when REDIS_URL is set.
+
+from __future__ import annotations
+
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger("openbooks")
+
+
+class ResponseCache:
+    """Serialized-response cache; keys embed the dataset version, so no invalidation is needed."""
+
+    def __init__(self, redis_url: str = "", ttl: int = 3600, max_local: int = 64):
+        self.ttl = ttl
+        self.max_local = max_local
+        self._local: Dict[str, bytes] = {}
+        self._redis = None
+        if redis_url:
+            try:
+                from redis.asyncio import Redis
+
+                self._redis = Redis.from_url(redis_url, socket_timeout=0.5)
+            except ImportError:
+                logger.warning("REDIS_URL is set but 'redis' is not installed; using in-process cache")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """Return cached bytes or None (Redis errors degrade to a miss)."""
+        body = self._local.get(key)
+        if body is None and self._redis is not None:
+            try:
+                body = await self._redis.get(key)
+            except Exception as exc:
+                logger.warning("redis get failed (%s); serving from in-process cache only", exc)
+            if body is not None:
+                self._remember(key, body)
+        return body
+
+    async def set(self, key: str, value: bytes) -> None:
+        """Store bytes locally and, best effort, in Redis with the configured TTL."""
+        self._remember(key, value)
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, value, ex=self.ttl)
+            except Exception as exc:
+                logger.warning("redis set failed (%s); serving from in-process cache only", exc)
+
+    def _remember(self, key: str, value: bytes) -> None:
+        if len(self._local) >= self.max_local:
+            self._local.clear()  # old dataset versions; cheap to rebuild
+        self._local[key] = value
@@ -3,18 +3,25 @@
 # Layers: Endpoints delegate data access to api/repository.py
 # Docs: interactive Swagger UI at /docs
 
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Literal, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Literal, Optional
 
+import itertools
 import logging
+import random
 import time
-import uuid
 
-from fastapi import Depends, FastAPI, HTTPException, Query, status
-from fastapi.responses import RedirectResponse
+import numpy as np
+import orjson
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel, Field, ConfigDict
-from prometheus_fastapi_instrumentator import Instrumentator
 
+from .cache import ResponseCache
 from .repository import CSVBookRepository
 from .settings import settings
 from .security import (
@@ -36,6 +43,19 @@ TAGS_METADATA = [
     {"name": "admin", "description": "Protected administrative operations."},
 ]
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm the dataset at startup, in a worker thread (not on the event loop).
+    Best effort: a missing/half-written CSV must not keep the app from booting;
+    get_repo() retries the load on the next request.
+    """
+    try:
+        await run_in_threadpool(_shared_repo().refresh)
+    except Exception:
+        logger.exception("dataset warm-up failed; will retry on first request")
+    yield
+
 app = FastAPI(
     title="OpenBooks API",
     version="1.0.0",
@@ -46,16 +66,24 @@ app = FastAPI(
     },
     contact={"name": "Ayla Atilio Florscuk", "url": "https://github.com/aylatilio"},
     openapi_tags=TAGS_METADATA,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# Compress larger JSON bodies (list/stats pages) for clients sending Accept-Encoding: gzip
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # ----------------------- Structured request logging --------------------- #
 logger = logging.getLogger("openbooks")
 logging.basicConfig(level=logging.INFO)
 
+# Request-correlation ids: a counter with a random start (no RNG call per request)
+_rid_counter = itertools.count(random.getrandbits(32))
+
 @app.middleware("http")
 async def log_requests(request, call_next):
     """Lightweight structured log per request + X-Request-ID header."""
-    rid = uuid.uuid4().hex[:8]
+    rid = format(next(_rid_counter) & 0xFFFFFFFF, "08x")
     start = time.perf_counter()
     response = await call_next(request)
     dur_ms = (time.perf_counter() - start) * 1000.0
@@ -67,8 +95,12 @@ async def log_requests(request, call_next):
     return response
 
 # ---------------------- Prometheus metrics endpoint --------------------- #
-# Exposes /metrics (not in OpenAPI schema)
-Instrumentator().instrument(app).expose(app, include_in_schema=False, endpoint="/metrics")
+# Exposes /metrics (not in OpenAPI schema); imported lazily so workers with
+# ENABLE_METRICS=false skip loading prometheus entirely
+if settings.ENABLE_METRICS:
+    from prometheus_fastapi_instrumentator import Instrumentator
+
+    Instrumentator().instrument(app).expose(app, include_in_schema=False, endpoint="/metrics")
 
 # --------------------------- OpenAPI schemas ---------------------------- #
 class Book(BaseModel):
@@ -90,7 +122,9 @@ class HealthResponse(BaseModel):
 class StatsOverviewResponse(BaseModel):
     total_books: int
     avg_price: float
-    ratings_distribution: Dict[str, int]
+    ratings_distribution: Dict[str, int] = Field(
+        ..., description="Book count per rating; keys are always in ascending rating order."
+    )
 
 class CategoryStats(BaseModel):
     category: str
@@ -128,7 +162,8 @@ class FeatureRow(BaseModel):
     category: str
 
 class PredictionIn(BaseModel):
-    id: Optional[int] = None
+    # Echoed back in the response; int64 bounds keep it encodable by orjson (422 otherwise)
+    id: Optional[int] = Field(None, ge=-(2**63), le=2**63 - 1)
     title: Optional[str] = None
     price: Optional[float] = None
     rating: Optional[int] = None
@@ -158,11 +193,83 @@ def _resolve_data_csv(path_str: str) -> Path:
 
 DATA_CSV = _resolve_data_csv(settings.DATA_CSV)
 
-def get_repo() -> CSVBookRepository:
-    """Dependency provider for the repository."""
-    return CSVBookRepository(DATA_CSV)
+@lru_cache(maxsize=1)
+def _shared_repo() -> CSVBookRepository:
+    """Single repository instance shared across requests.
+
+    The repository reloads its DataFrame itself when the CSV mtime changes,
+    so a single instance stays fresh without re-parsing on every request.
+    """
+    cache_path = DATA_CSV.with_suffix(".feather") if settings.DATA_CACHE else None
+    return CSVBookRepository(DATA_CSV, cache_path=cache_path)
+
+async def get_repo() -> CSVBookRepository:
+    """
+    Dependency provider for the repository (async: resolved on the event loop).
+    A first load or a reload after a CSV change is a full parse, so it runs in
+    the threadpool; the common case is just one stat() and no threadpool hop.
+    """
+    repo = _shared_repo()
+    if repo.is_stale():
+        await run_in_threadpool(repo.refresh)
+    return repo
+
+response_cache = ResponseCache(settings.REDIS_URL)
+
+async def _cached_json(response: Response, repo: CSVBookRepository, name: str, compute: Callable[[], Any]) -> Response:
+    """
+    Serve a dataset-wide payload from the shared response cache (key: dataset version + name).
+    Headers already set on `response` by dependencies (ETag, Cache-Control) are carried over.
+    """
+    version = repo.version()
+    key = f"openbooks:{version}:{name}"
+    body = await response_cache.get(key)
+    if body is None:
+        body = orjson.dumps(compute())
+        # Store only if the dataset did not change while computing, so bytes from
+        # one snapshot are never cached under another snapshot's version.
+        if repo.version() == version:
+            await response_cache.set(key, body)
+    return Response(content=body, media_type="application/json", headers=response.headers)
+
+def _if_none_match(request: Request) -> List[str]:
+    """Entity tags from If-None-Match, compared weakly (W/ prefix dropped)."""
+    header = request.headers.get("if-none-match", "")
+    return [tag.strip().removeprefix("W/") for tag in header.split(",") if tag.strip()]
+
+def etag_for(key: str, max_age: int = 60):
+    """
+    Dependency factory: ETag keyed on the dataset version + `key`, plus Cache-Control.
+    Answers 304 Not Modified (no body, no serialization) when the client copy is current.
+    """
+    cache_control = f"public, max-age={max_age}" if max_age else "no-cache"
+
+    async def dependency(request: Request, response: Response, repo: CSVBookRepository = Depends(get_repo)) -> None:
+        tag = f'"{repo.version()}-{key}"'
+        headers = {"ETag": f"W/{tag}", "Cache-Control": cache_control}
+        tags = _if_none_match(request)
+        if tag in tags or "*" in tags:
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
+    return dependency
+
+def _set_next_cursor(response: Response, rows: List[dict], limit: int) -> None:
+    """Keyset pagination: advertise the last id of a full page as the next cursor."""
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1]["id"])
+
+NDJSON = "application/x-ndjson"
+
+def _ndjson(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """Encode row batches as newline-delimited JSON, one chunk per batch."""
+    for rows in batches:
+        yield b"".join(orjson.dumps(row) + b"\n" for row in rows)
 
 # -------------------------------- Routes -------------------------------- #
+# List endpoints (books, top-rated, price-range, search, features, training-data)
+# return ORJSONResponse directly: rows come from our own repository, so FastAPI's
+# per-row response_model validation is skipped; response_model stays for the docs.
 @app.get(
     "/api/v1/health",
     response_model=HealthResponse,
@@ -170,10 +277,14 @@ def get_repo() -> CSVBookRepository:
     summary="Health probe",
     response_description="Current service status and dataset metadata.",
     response_model_exclude_none=True,
+    dependencies=[Depends(etag_for("health", max_age=0))],
 )
-def health(repo: CSVBookRepository = Depends(get_repo)):
-    """Basic readiness + dataset visibility."""
-    return repo.health()
+async def health(response: Response, repo: CSVBookRepository = Depends(get_repo)):
+    """Basic readiness + dataset visibility (pre-serialized until the CSV changes)."""
+    return await _cached_json(
+        response, repo, "health",
+        lambda: {k: v for k, v in repo.health().items() if v is not None},
+    )
 
 @app.get(
     "/api/v1/books",
@@ -182,14 +293,20 @@ def health(repo: CSVBookRepository = Depends(get_repo)):
     summary="List books (paginated)",
     response_description="A paginated list of books.",
 )
-def list_books(
+async def list_books(
     limit: int = Query(100, ge=1, le=1000, description="Max number of items to return."),
     offset: int = Query(0, ge=0, description="Number of items to skip."),
+    cursor: Optional[int] = Query(
+        None, ge=0,
+        description="Return items after this id (overrides offset). Use the X-Next-Cursor header of the previous page.",
+    ),
     repo: CSVBookRepository = Depends(get_repo),
 ):
-    """1-based 'id' is derived from CSV row order."""
-    rows = repo.list(limit=limit, offset=offset)
-    return [Book(**row) for row in rows]
+    """1-based 'id' is derived from CSV row order, so a cursor maps straight to a row position."""
+    rows = repo.list(limit=limit, offset=offset if cursor is None else cursor)
+    response = ORJSONResponse(rows)
+    _set_next_cursor(response, rows, limit)
+    return response
 
 @app.get(
     "/api/v1/books/top-rated",
@@ -197,16 +314,15 @@ def list_books(
     tags=["books"],
     summary="Top rated books",
 )
-def top_rated(
+async def top_rated(
     limit: int = Query(10, ge=1, le=100, description="How many items to return."),
     repo: CSVBookRepository = Depends(get_repo),
 ):
     """Top-N by rating (desc)."""
-    rows = repo.top_rated(limit=limit)
-    return [Book(**row) for row in rows]
+    return ORJSONResponse(repo.top_rated(limit=limit))
 
 @app.get("/api/v1/books/price-range", response_model=List[Book], tags=["books"], summary="Books in a price range")
-def price_range(
+async def price_range(
     min_price: float = Query(..., ge=0, description="Minimum price (inclusive).", example=20),
     max_price: float = Query(..., ge=0, description="Maximum price (inclusive).", example=30),
     limit: int = Query(100, ge=1, le=1000, example=5),
@@ -214,8 +330,7 @@ def price_range(
     repo: CSVBookRepository = Depends(get_repo),
 ):
     """Items priced within [min_price, max_price] (inclusive)."""
-    rows = repo.price_range(min_price=min_price, max_price=max_price, limit=limit, offset=offset)
-    return [Book(**row) for row in rows]
+    return ORJSONResponse(repo.price_range(min_price=min_price, max_price=max_price, limit=limit, offset=offset))
 
 @app.get(
     "/api/v1/books/search",
@@ -223,7 +338,7 @@ def price_range(
     tags=["books"],
     summary="Search by title/category",
 )
-def search_books(
+async def search_books(
     title: Optional[str] = Query(None, description="Case-insensitive substring on title.", example="moon"),
     category: Optional[str] = Query(None, description="Case-insensitive substring on category.", example="Travel"),
     limit: int = Query(100, ge=1, le=1000, example=5),
@@ -231,8 +346,8 @@ def search_books(
     repo: CSVBookRepository = Depends(get_repo),
 ):
     """Search by optional title/category with pagination."""
-    rows = repo.search(title=title, category=category, limit=limit, offset=offset)
-    return [Book(**row) for row in rows]
+    rows = await run_in_threadpool(repo.search, title=title, category=category, limit=limit, offset=offset)
+    return ORJSONResponse(rows)
 
 @app.get(
     "/api/v1/books/{book_id}",
@@ -241,22 +356,23 @@ def search_books(
     summary="Get a single book by ID",
     responses={404: {"description": "Book not found"}},
 )
-def get_book(book_id: int, repo: CSVBookRepository = Depends(get_repo)):
+async def get_book(book_id: int, repo: CSVBookRepository = Depends(get_repo)):
     """1-based ID access."""
     row = repo.get(book_id)
     if not row:
         raise HTTPException(status_code=404, detail="Book not found")
-    return Book(**row)
+    return Book.model_construct(**row)
 
 @app.get(
     "/api/v1/categories",
     response_model=List[str],
     tags=["categories"],
     summary="List categories",
+    dependencies=[Depends(etag_for("categories"))],
 )
-def list_categories(repo: CSVBookRepository = Depends(get_repo)):
+async def list_categories(response: Response, repo: CSVBookRepository = Depends(get_repo)):
     """Unique categories sorted alphabetically."""
-    return repo.categories()
+    return await _cached_json(response, repo, "categories", repo.categories)
 
 @app.get(
     "/api/v1/stats/overview",
@@ -264,20 +380,22 @@ def list_categories(repo: CSVBookRepository = Depends(get_repo)):
     tags=["stats"],
     summary="Global stats",
     response_model_exclude_none=True,
+    dependencies=[Depends(etag_for("stats-overview"))],
 )
-def stats_overview(repo: CSVBookRepository = Depends(get_repo)):
+async def stats_overview(response: Response, repo: CSVBookRepository = Depends(get_repo)):
     """Count, average price and rating distribution."""
-    return repo.stats_overview()
+    return await _cached_json(response, repo, "stats-overview", repo.stats_overview)
 
 @app.get(
     "/api/v1/stats/categories",
     response_model=List[CategoryStats],
     tags=["stats"],
     summary="Stats per category",
+    dependencies=[Depends(etag_for("stats-categories"))],
 )
-def stats_categories(repo: CSVBookRepository = Depends(get_repo)):
+async def stats_categories(response: Response, repo: CSVBookRepository = Depends(get_repo)):
     """Per-category count + price stats."""
-    return repo.stats_by_category()
+    return await _cached_json(response, repo, "stats-categories", repo.stats_by_category)
 
 # ------------------------------ AUTH ------------------------------ #
 @app.post("/api/v1/auth/login", response_model=TokenResponse, tags=["auth"])
@@ -310,25 +428,45 @@ def trigger_scraping(admin: str = Depends(require_admin)):
 
 # --------------------------------- ML ----------------------------------- #
 @app.get("/api/v1/ml/features", response_model=List[FeatureRow], tags=["ml"])
-def ml_features(
+async def ml_features(
     limit: int = Query(100, ge=1, le=10_000, example=5),
     offset: int = Query(0, ge=0, example=0),
     repo: CSVBookRepository = Depends(get_repo),
 ):
     """Normalized columns ready for notebooks."""
-    return [FeatureRow(**row) for row in repo.features(limit=limit, offset=offset)]
+    return ORJSONResponse(await run_in_threadpool(repo.features, limit=limit, offset=offset))
 
-@app.get("/api/v1/ml/training-data", response_model=List[FeatureRow], tags=["ml"])
-def ml_training_data(
+@app.get(
+    "/api/v1/ml/training-data",
+    response_model=List[FeatureRow],
+    tags=["ml"],
+    responses={200: {"content": {NDJSON: {}}, "description": "JSON array, or NDJSON when requested via Accept."}},
+)
+async def ml_training_data(
+    request: Request,
     limit: int = Query(1000, ge=1, le=50_000, example=10),
     offset: int = Query(0, ge=0, example=0),
+    cursor: Optional[int] = Query(None, ge=0, description="Return rows after this id (overrides offset)."),
     repo: CSVBookRepository = Depends(get_repo),
 ):
-    """Large page size intended for offline downloads/training."""
-    return [FeatureRow(**row) for row in repo.training_data(limit=limit, offset=offset)]
+    """
+    Large page size intended for offline downloads/training; page with X-Next-Cursor.
+    Send `Accept: application/x-ndjson` to stream one JSON object per line instead.
+    """
+    start = offset if cursor is None else cursor
+    if NDJSON in request.headers.get("accept", ""):
+        response = StreamingResponse(_ndjson(repo.iter_training_data(limit=limit, offset=start)), media_type=NDJSON)
+        # Headers go out before the body: derive the cursor from the row count (ids are 1-based positions)
+        if start + limit <= repo.count():
+            response.headers["X-Next-Cursor"] = str(start + limit)
+        return response
+    rows = await run_in_threadpool(repo.training_data, limit=limit, offset=start)
+    response = ORJSONResponse(rows)
+    _set_next_cursor(response, rows, limit)
+    return response
 
 @app.post("/api/v1/ml/predictions", response_model=List[PredictionOut], tags=["ml"])
-def ml_predictions(
+async def ml_predictions(
     body: PredictionsRequest,
     repo: CSVBookRepository = Depends(get_repo),
 ):
@@ -336,25 +474,25 @@ def ml_predictions(
     Placeholder: predicts 1 if (rating >= 4) OR (price >= dataset average), else 0.
     Deterministic and stateless — demo only.
     """
-    avg_price = repo.avg_price()
-    out: List[PredictionOut] = []
-
-    for i, item in enumerate(body.items):
-        # Backfill from repo if only id was provided
-        if item.id is not None and (item.price is None or item.rating is None):
-            row = repo.get(item.id)
-            if row:
-                if item.price is None:
-                    item.price = float(row.get("price") or 0.0)
-                if item.rating is None:
-                    item.rating = int(row.get("rating") or 0)
-
-        price = float(item.price or 0.0)
-        rating = int(item.rating or 0)
-        pred = 1.0 if (rating >= 4 or price >= avg_price) else 0.0
-        out.append(PredictionOut(id=item.id if item.id is not None else (i + 1), prediction=pred))
-
-    return out
+    items = body.items
+    prices = np.array([np.nan if it.price is None else it.price for it in items], dtype=np.float64)
+    ratings = np.array([np.nan if it.rating is None else it.rating for it in items], dtype=np.float64)
+
+    # Backfill from repo (one gather) where only the id was provided
+    backfill = [i for i, it in enumerate(items) if it.id is not None and (it.price is None or it.rating is None)]
+    if backfill:
+        repo_prices, repo_ratings = repo.price_rating([items[i].id for i in backfill])
+        prices[backfill] = np.where(np.isnan(prices[backfill]), repo_prices, prices[backfill])
+        ratings[backfill] = np.where(np.isnan(ratings[backfill]), repo_ratings, ratings[backfill])
+
+    prices = np.nan_to_num(prices, nan=0.0)
+    ratings = np.nan_to_num(ratings, nan=0.0)
+    preds = np.where((ratings >= 4) | (prices >= repo.avg_price()), 1.0, 0.0)
+
+    return [
+        PredictionOut.model_construct(id=it.id if it.id is not None else (i + 1), prediction=float(pred))
+        for i, (it, pred) in enumerate(zip(items, preds))
+    ]
 
 # ------------------------------- Root redirect -------------------------- #
 @app.get("/", include_in_schema=False)
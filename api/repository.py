@@ -1,23 +1,89 @@
 # Data-access layer backed by a CSV file. Keeps API decoupled from the storage.
 
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional
+from typing import Any, Callable, Iterator, List, Optional, Sequence, Tuple
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pyarrow import feather
 import datetime as dt
+import os
+import threading
 
 # Expected CSV schema
 EXPECTED = ["title", "price", "rating", "availability", "category", "image_url", "product_url"]
 
 
-def _load_df(csv_path: Path) -> pd.DataFrame:
-    """Load CSV with stable schema; return empty frame if missing."""
-    if not csv_path.exists():
-        return pd.DataFrame(columns=EXPECTED)
-    df = pd.read_csv(csv_path, encoding="utf-8-sig")
-    for col in EXPECTED:
-        if col not in df.columns:
-            df[col] = None
-    return df[EXPECTED].copy()
+def _typed(df: pd.DataFrame) -> pd.DataFrame:
+    """Coerce column types once so queries can work on typed columns."""
+    df["price"] = pd.to_numeric(df["price"], errors="coerce")
+    # Ratings are 0..5: int8 when complete (stays float only if some are missing)
+    df["rating"] = pd.to_numeric(df["rating"], errors="coerce", downcast="integer")
+    # Few distinct values: store as integer codes + vocabulary
+    df["category"] = df["category"].astype("category")
+    return df
+
+
+def _load_df(csv_path: Path, cache_path: Optional[Path] = None) -> pd.DataFrame:
+    """Load CSV with stable schema; return empty frame if missing.
+
+    When cache_path is given, a Feather copy made from this exact CSV (same
+    mtime_ns and size) is read instead, and a fresh copy is written after
+    parsing the CSV.
+    """
+    try:
+        source = csv_path.stat()  # taken before reading: a concurrent rewrite just invalidates the copy
+    except OSError:
+        return _typed(pd.DataFrame(columns=EXPECTED))
+    if cache_path is not None:
+        cached = _read_cache(source, cache_path)
+        if cached is not None:
+            return cached
+    # Arrow's multithreaded C++ reader; numeric columns come out typed, _typed() finishes the rest
+    df = pd.read_csv(csv_path, encoding="utf-8-sig", engine="pyarrow")
+    # Fresh frame from read_csv: type it in place; reindex (adds missing columns) only when needed
+    if list(df.columns) != EXPECTED:
+        df = df.reindex(columns=EXPECTED)
+    df = _typed(df)
+    if cache_path is not None:
+        _write_cache(df, source, cache_path)
+    return df
+
+
+def _source_tag(source: os.stat_result) -> dict:
+    """Identity of the CSV a Feather copy was built from (stored in its schema metadata)."""
+    return {b"openbooks.csv_mtime_ns": str(source.st_mtime_ns).encode(), b"openbooks.csv_size": str(source.st_size).encode()}
+
+
+def _read_cache(source: os.stat_result, cache_path: Path) -> Optional[pd.DataFrame]:
+    """Return the Feather copy only if it was built from this exact CSV, else None.
+
+    Comparing recorded mtime_ns + size (not "cache newer than CSV") also catches a
+    CSV replaced by a file with an older mtime (cp -p, rsync -a, restored backups).
+    """
+    try:
+        table = feather.read_table(cache_path)
+    except Exception:
+        return None
+    metadata = table.schema.metadata or {}
+    if any(metadata.get(k) != v for k, v in _source_tag(source).items()):
+        return None
+    df = table.to_pandas()
+    return df if list(df.columns) == EXPECTED else None
+
+
+def _write_cache(df: pd.DataFrame, source: os.stat_result, cache_path: Path) -> None:
+    """Best-effort atomic write of the Feather copy (write-then-rename), tagged with its source CSV."""
+    tmp = cache_path.with_name(cache_path.name + ".tmp")
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), **_source_tag(source)})
+        feather.write_feather(table, tmp)
+        os.replace(tmp, cache_path)
+    except Exception:
+        tmp.unlink(missing_ok=True)
 
 
 def _with_ids(df: pd.DataFrame) -> pd.DataFrame:
@@ -27,72 +93,206 @@ def _with_ids(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+def _arrow_strings(col: pd.Series) -> pa.Array:
+    """Column as an Arrow string array (missing -> null) for pyarrow.compute kernels."""
+    return pa.array(col.astype("string[pyarrow]"))
+
+
+def _nanmean(values: np.ndarray) -> float:
+    """Mean ignoring NaNs (0.0 when nothing is left)."""
+    values = values[~np.isnan(values)]
+    return float(values.mean()) if values.size else 0.0
+
+
+def _records(df: pd.DataFrame) -> List[dict]:
+    """Materialize rows as plain dicts (native Python scalars) for the API layer."""
+    records = df.to_dict(orient="records")
+    # A blank rating leaves the column float: keep the others ints, missing -> None
+    if "rating" in df.columns and df["rating"].dtype.kind == "f":
+        for row in records:
+            rating = row["rating"]
+            row["rating"] = None if rating != rating else int(rating)
+    return records
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """Everything derived from one load of the CSV.
+
+    Built completely before it is published, then swapped in with a single
+    assignment, so readers never see a new frame next to stale lookups.
+    Only `stats` (the per-load memo) is filled in afterwards.
+    """
+    mtime: Optional[float]
+    df: pd.DataFrame
+    titles: pa.Array
+    records: List[dict]
+    by_rating: pd.DataFrame
+    by_price: pd.DataFrame
+    prices: np.ndarray
+    rows: int
+    last_updated: Optional[str]
+    stats: dict = field(default_factory=dict)
+
+
 class CSVBookRepository:
     """Thin repository over a CSV; easy to swap for a DB implementation later."""
 
-    def __init__(self, csv_path: Path):
+    def __init__(self, csv_path: Path, cache_path: Optional[Path] = None):
         self.csv_path = csv_path
-        self._cache_df: Optional[pd.DataFrame] = None
-        self._cache_mtime: Optional[float] = None
+        self.cache_path = cache_path
+        self._snap: Optional[_Snapshot] = None
+        self._load_lock = threading.Lock()
+
+    def _csv_mtime(self) -> Optional[float]:
+        try:
+            return self.csv_path.stat().st_mtime
+        except OSError:
+            return None
+
+    def _snapshot(self) -> _Snapshot:
+        """Return the current snapshot; reload if the CSV mtime changed.
+
+        One thread loads at a time. While a reload is running, other callers
+        keep getting the previous snapshot instead of waiting (only the very
+        first load blocks).
+        """
+        snap = self._snap
+        if snap is not None and self._csv_mtime() == snap.mtime:
+            return snap
+        if not self._load_lock.acquire(blocking=snap is None):
+            return snap
+        try:
+            snap = self._snap
+            mtime = self._csv_mtime()
+            if snap is None or mtime != snap.mtime:
+                snap = self._load(mtime)
+                self._snap = snap
+            return snap
+        finally:
+            self._load_lock.release()
+
+    def _load(self, mtime: Optional[float]) -> _Snapshot:
+        """Build a snapshot: the frame plus every lookup structure derived from it."""
+        df = _with_ids(_load_df(self.csv_path, self.cache_path))
+        # Orderings served by top_rated / price_range (sorted once per load)
+        by_price = df.sort_values(["price", "id"], ascending=[True, True])
+        return _Snapshot(
+            mtime=mtime,
+            df=df,
+            titles=_arrow_strings(df["title"]),
+            # Dense 1-based ids: row dict for id N lives at position N-1
+            records=_records(df),
+            by_rating=df.sort_values(["rating", "id"], ascending=[False, True], na_position="last"),
+            by_price=by_price,
+            prices=by_price["price"].to_numpy(),
+            # Health metadata is fixed per load
+            rows=int(len(df)),
+            last_updated=dt.datetime.fromtimestamp(mtime).isoformat() if mtime else None,
+        )
+
+    def is_stale(self) -> bool:
+        """True when nothing is loaded yet or the CSV changed since the last load."""
+        snap = self._snap
+        return snap is None or self._csv_mtime() != snap.mtime
+
+    def refresh(self) -> None:
+        """Load (or reload) now if stale; lets callers do the parse off the event loop."""
+        self._snapshot()
 
     def _df(self) -> pd.DataFrame:
         """Return cached DataFrame; reload if file mtime changed."""
-        mtime = self.csv_path.stat().st_mtime if self.csv_path.exists() else None
-        if self._cache_df is None or mtime != self._cache_mtime:
-            self._cache_df = _with_ids(_load_df(self.csv_path))
-            self._cache_mtime = mtime
-        return self._cache_df
+        return self._snapshot().df
+
+    def _memo(self, key: str, compute: Callable[[_Snapshot], Any]) -> Any:
+        """Memoize a dataset-wide aggregate on the snapshot it was computed from."""
+        snap = self._snapshot()
+        stats = snap.stats
+        if key not in stats:
+            stats[key] = compute(snap)
+        return stats[key]
 
     # ---------- Core queries ----------
 
+    def version(self) -> int:
+        """Dataset version token (CSV mtime in ns; 0 when missing), for HTTP caching."""
+        return int((self._snapshot().mtime or 0) * 1_000_000_000)
+
+    def count(self) -> int:
+        """Number of rows in the current snapshot."""
+        return self._snapshot().rows
+
     def health(self) -> dict:
         """Basic dataset status and metadata."""
-        exists = self.csv_path.exists()
-        rows = int(len(self._df())) if exists else 0
-        last_updated = (
-            dt.datetime.fromtimestamp(self._cache_mtime).isoformat()
-            if self._cache_mtime else None
-        )
-        return {"status": "ok", "csv_exists": exists, "rows": rows, "last_updated": last_updated}
+        snap = self._snapshot()  # single stat; reloads if the CSV changed
+        return {
+            "status": "ok",
+            "csv_exists": snap.mtime is not None,
+            "rows": snap.rows,
+            "last_updated": snap.last_updated,
+        }
 
     def list(self, limit: int, offset: int) -> List[dict]:
-        """Paginated listing."""
-        df = self._df().iloc[offset: offset + limit]
-        return [row.to_dict() for _, row in df.iterrows()]
+        """Paginated listing (a slice of the per-load row dicts; callers treat rows as read-only)."""
+        return self._snapshot().records[offset: offset + limit]
 
     def get(self, book_id: int) -> Optional[dict]:
         """Get a single row by 1-based id."""
-        df = self._df()
-        if 1 <= book_id <= len(df):
-            return df.iloc[book_id - 1].to_dict()
+        records = self._snapshot().records
+        if 1 <= book_id <= len(records):
+            return dict(records[book_id - 1])
         return None
 
+    def price_rating(self, ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Gather (price, rating) arrays for 1-based ids in one shot; NaN for unknown ids."""
+        df = self._df()
+        n = len(df)
+        pos = np.array([i - 1 if 1 <= i <= n else -1 for i in ids], dtype=np.int64)
+        found = pos >= 0
+        prices = np.full(pos.size, np.nan)
+        ratings = np.full(pos.size, np.nan)
+        prices[found] = df["price"].to_numpy(dtype=np.float64)[pos[found]]
+        ratings[found] = df["rating"].to_numpy(dtype=np.float64)[pos[found]]
+        return prices, ratings
+
     def search(self, title: Optional[str], category: Optional[str], limit: int, offset: int) -> List[dict]:
         """Filter by optional title/category (case-insensitive), with pagination."""
-        df = self._df()
+        snap = self._snapshot()
+        df = snap.df
+        mask = None
         if title:
-            df = df[df["title"].str.contains(title, case=False, na=False)]
+            # Arrow's C++ substring kernel, case-insensitive; no lower-cased copy to keep around
+            matches = pc.match_substring(snap.titles, title, ignore_case=True)
+            mask = matches.fill_null(False).to_numpy(zero_copy_only=False)
         if category:
-            df = df[df["category"].str.contains(category, case=False, na=False)]
+            # Match against the category vocabulary, then select rows by code
+            needle = category.lower()
+            cat = df["category"].cat
+            codes = [code for code, name in enumerate(cat.categories) if needle in str(name).lower()]
+            by_category = np.isin(cat.codes.to_numpy(), codes)
+            mask = by_category if mask is None else mask & by_category
+        if mask is not None:
+            df = df[mask]
         df = df.iloc[offset: offset + limit]
-        return [row.to_dict() for _, row in df.iterrows()]
+        return _records(df)
 
     def categories(self) -> List[str]:
         """Unique categories sorted alphabetically (empties trimmed)."""
-        df = self._df()
-        return sorted(c for c in df["category"].dropna().unique().tolist() if str(c).strip())
+        return self._memo("categories", self._categories)
 
-    # ---------- Stats / insights ----------
+    def _categories(self, snap: _Snapshot) -> List[str]:
+        # The categorical vocabulary is already the set of distinct non-null values
+        vocab = snap.df["category"].cat.categories
+        return sorted(str(c) for c in vocab if str(c).strip())
 
-    def _numeric_price(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Coerce 'price' to numeric for stats/filters."""
-        df = df.copy()
-        df["price"] = pd.to_numeric(df["price"], errors="coerce")
-        return df
+    # ---------- Stats / insights ----------
 
     def stats_overview(self) -> dict:
         """Return total_books, avg_price, and ratings_distribution."""
-        df = self._numeric_price(self._df())
+        return self._memo("stats_overview", self._stats_overview)
+
+    def _stats_overview(self, snap: _Snapshot) -> dict:
+        df = snap.df
         total = int(len(df))
         if total == 0:
             return {
@@ -100,64 +300,95 @@ class CSVBookRepository:
                 "avg_price": 0.0,
                 "ratings_distribution": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 0},
             }
-        avg_price = float(df["price"].mean(skipna=True)) if "price" in df else 0.0
-        vc = df["rating"].value_counts(dropna=True).to_dict()
-        dist = {str(int(k)): int(v) for k, v in vc.items()}
-        for k in ("1", "2", "3", "4", "5"):
-            dist.setdefault(k, 0)
+        ratings = df["rating"].dropna().to_numpy(dtype=np.int64)
+        counts = np.bincount(ratings[ratings >= 0], minlength=6)
+        # Always report 1..5; keep any out-of-scale rating (e.g. 0) that is present.
+        # Keys come out in ascending order, which clients may rely on (no re-sorting).
+        dist = {str(k): int(n) for k, n in enumerate(counts) if n or 1 <= k <= 5}
+        avg_price = _nanmean(df["price"].to_numpy(dtype=np.float64))
         return {"total_books": total, "avg_price": round(avg_price, 2), "ratings_distribution": dist}
 
     def stats_by_category(self) -> List[dict]:
         """Per-category metrics sorted by count desc."""
-        df = self._numeric_price(self._df())
-        if df.empty:
+        return self._memo("stats_by_category", self._stats_by_category)
+
+    def _stats_by_category(self, snap: _Snapshot) -> List[dict]:
+        df = snap.df
+        cat = df["category"].cat
+        codes, names = cat.codes.to_numpy(), cat.categories
+        prices = df["price"].to_numpy(dtype=np.float64)
+        valid = (codes >= 0) & ~np.isnan(prices)
+        codes, prices = codes[valid], prices[valid]
+        if codes.size == 0:
             return []
-        g = (
-            df.groupby("category", dropna=True)["price"]
-              .agg(count="count", avg="mean", min="min", max="max")
-              .reset_index()
-              .sort_values(["count", "category"], ascending=[False, True])
-        )
-        out: List[dict] = []
-        for _, row in g.iterrows():
-            out.append({
-                "category": str(row["category"]),
-                "count": int(row["count"]),
-                "avg_price": round(float(row["avg"]), 2),
-                "min_price": round(float(row["min"]), 2),
-                "max_price": round(float(row["max"]), 2),
-            })
+
+        # Sort by category code once, then reduce each contiguous run
+        order = np.argsort(codes, kind="stable")
+        codes, prices = codes[order], prices[order]
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        counts = np.diff(np.r_[starts, codes.size])
+        sums = np.add.reduceat(prices, starts)
+        mins = np.minimum.reduceat(prices, starts)
+        maxs = np.maximum.reduceat(prices, starts)
+
+        out = [
+            {
+                "category": str(names[code]),
+                "count": int(n),
+                "avg_price": round(float(total / n), 2),
+                "min_price": round(float(lo), 2),
+                "max_price": round(float(hi), 2),
+            }
+            for code, n, total, lo, hi in zip(codes[starts], counts, sums, mins, maxs)
+        ]
+        out.sort(key=lambda r: (-r["count"], r["category"]))
         return out
 
     def top_rated(self, limit: int) -> List[dict]:
         """Top-N by rating desc; tie-break by id asc."""
-        df = self._df().copy()
-        df["rating"] = pd.to_numeric(df["rating"], errors="coerce")
-        df = df.sort_values(["rating", "id"], ascending=[False, True], na_position="last").head(limit)
-        return [row.to_dict() for _, row in df.iterrows()]
+        df = self._snapshot().by_rating.head(limit)
+        return _records(df)
 
     def price_range(self, min_price: float, max_price: float, limit: int, offset: int) -> List[dict]:
         """Filter by inclusive [min_price, max_price], sort by price asc then id."""
-        df = self._numeric_price(self._df())
-        df = df[df["price"].between(min_price, max_price, inclusive="both")]
-        df = df.sort_values(["price", "id"], ascending=[True, True]).iloc[offset: offset + limit]
-        return [row.to_dict() for _, row in df.iterrows()]
+        snap = self._snapshot()
+        prices = snap.prices
+        lo = int(np.searchsorted(prices, min_price, side="left"))
+        hi = int(np.searchsorted(prices, max_price, side="right"))
+        start = lo + offset
+        df = snap.by_price.iloc[start: min(start + limit, hi)]
+        return _records(df)
 
     def features(self, limit: int, offset: int) -> List[dict]:
         """Normalized columns for ML consumption."""
-        df = self._numeric_price(self._df())
+        return self._features(self._snapshot(), limit, offset)
+
+    def _features(self, snap: _Snapshot, limit: int, offset: int) -> List[dict]:
+        df = snap.df
         if df.empty:
             return []
-        out = df.loc[:, ["id", "title", "price", "rating", "category"]].copy()
-        out["category"] = out["category"].astype(str).str.strip()
-        out = out.iloc[offset: offset + limit]
-        return [row.to_dict() for _, row in out.iterrows()]
+        # Slice rows first so only the page (not every row) is copied into the narrow frame
+        out = df.iloc[offset: offset + limit].loc[:, ["id", "title", "price", "rating", "category"]]
+        out = out.assign(category=out["category"].astype(str).str.strip())
+        return _records(out)
 
     def training_data(self, limit: int, offset: int) -> List[dict]:
         """Alias to features (kept separate for future evolution)."""
         return self.features(limit=limit, offset=offset)
 
+    def iter_training_data(self, limit: int, offset: int, batch_size: int = 1000) -> Iterator[List[dict]]:
+        """Yield training rows in batches so large pages can be streamed (all from one snapshot)."""
+        snap = self._snapshot()
+        stop = offset + limit
+        for start in range(offset, stop, batch_size):
+            rows = self._features(snap, min(batch_size, stop - start), start)
+            if not rows:
+                return
+            yield rows
+
     def avg_price(self) -> float:
         """Dataset mean price (0.0 if empty)."""
-        df = self._numeric_price(self._df())
-        return 0.0 if df.empty else float(df["price"].mean(skipna=True))
+        return self._memo("avg_price", self._avg_price)
+
+    def _avg_price(self, snap: _Snapshot) -> float:
+        return _nanmean(snap.df["price"].to_numpy(dtype=np.float64))
@@ -3,6 +3,14 @@
 from __future__ import annotations
 
 from datetime import datetime, timedelta, timezone
+from typing import Set, Tuple
+import base64
+import hashlib
+import hmac
+import math
+import time
+
+import orjson
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -12,21 +20,43 @@ from .settings import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
+# Settings are frozen at startup: bind what the auth path reads to module constants
+_SECRET_KEY = settings.SECRET_KEY
+_SIGNING_KEY = _SECRET_KEY.encode()  # HMAC key bytes, encoded once
+_ALGORITHM = settings.ALGORITHM
+_ADMIN_USERNAME = settings.ADMIN_USERNAME
+_ADMIN_PASSWORD_HASH = settings.ADMIN_PASSWORD_HASH
+_ACCESS_MINUTES = settings.ACCESS_TOKEN_EXPIRE_MINUTES
+_REFRESH_MINUTES = settings.REFRESH_TOKEN_EXPIRE_MINUTES
+
 # -------------------------- Password helpers --------------------------- #
+# (sha256(plaintext), hash) pairs that already passed bcrypt. Only successes are
+# stored (never the plaintext itself); the set is small and reset when full.
+_VERIFIED_MAX = 4
+_verified: Set[Tuple[bytes, str]] = set()
+
 def verify_password(plain_password: str, password_hash: str) -> bool:
     """Verify plaintext vs bcrypt hash (safe fallback to False)."""
+    key = (hashlib.sha256(plain_password.encode()).digest(), password_hash)
+    if key in _verified:
+        return True
     try:
-        return bcrypt.verify(plain_password, password_hash)
+        ok = bcrypt.verify(plain_password, password_hash)
     except Exception:
         return False
+    if ok:
+        if len(_verified) >= _VERIFIED_MAX:
+            _verified.clear()
+        _verified.add(key)
+    return ok
 
 def authenticate_admin(username: str, password: str) -> bool:
     """Validate admin username + bcrypt hash from env."""
-    if username != settings.ADMIN_USERNAME:
+    if username != _ADMIN_USERNAME:
         return False
-    if not settings.ADMIN_PASSWORD_HASH:
+    if not _ADMIN_PASSWORD_HASH:
         return False
-    return verify_password(password, settings.ADMIN_PASSWORD_HASH)
+    return verify_password(password, _ADMIN_PASSWORD_HASH)
 
 # ---------------------------- JWT helpers ------------------------------- #
 def _create_token(subject: str, minutes: int, token_type: str) -> str:
@@ -38,20 +68,68 @@ def _create_token(subject: str, minutes: int, token_type: str) -> str:
         "exp": int((now + timedelta(minutes=minutes)).timestamp()),
         "type": token_type,
     }
-    return jwt.encode(payload, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return jwt.encode(payload, _SECRET_KEY, algorithm=_ALGORITHM)
 
 def create_access_token(subject: str) -> str:
     """Short-lived token for API calls."""
-    return _create_token(subject, settings.ACCESS_TOKEN_EXPIRE_MINUTES, "access")
+    return _create_token(subject, _ACCESS_MINUTES, "access")
 
 def create_refresh_token(subject: str) -> str:
     """Long-lived token used to mint a new access token."""
-    return _create_token(subject, settings.REFRESH_TOKEN_EXPIRE_MINUTES, "refresh")
+    return _create_token(subject, _REFRESH_MINUTES, "refresh")
+
+def _b64url_decode(segment: str) -> bytes:
+    return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+
+def _decode_hs256(token: str) -> dict:
+    """
+    Verify an HS256 JWT directly with hmac, mirroring jose.jwt.decode's default checks:
+    alg + signature, numeric exp/nbf/iat (truncated to int like jose), exp/nbf against
+    the current time, string sub/jti, and no aud (no audience is configured).
+    Only difference: numeric *strings* in time claims are rejected (jose int()-parses them).
+    """
+    parts = token.split(".")
+    if len(parts) != 3:
+        raise JWTError("Not enough segments")
+    try:
+        header = orjson.loads(_b64url_decode(parts[0]))
+        claims = orjson.loads(_b64url_decode(parts[1]))
+        signature = _b64url_decode(parts[2])
+    except ValueError as exc:
+        raise JWTError("Invalid token encoding") from exc
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise JWTError("Invalid token structure")
+
+    signing_input = f"{parts[0]}.{parts[1]}".encode()
+    expected = hmac.new(_SIGNING_KEY, signing_input, hashlib.sha256).digest()
+    if header.get("alg") != "HS256" or not hmac.compare_digest(expected, signature):
+        raise JWTError("Signature verification failed.")
+
+    times = {}
+    for claim in ("exp", "nbf", "iat"):
+        if claim in claims:
+            value = claims[claim]
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+                raise JWTError(f"{claim} claim must be an integer.")
+            times[claim] = int(value)
+    now = int(time.time())
+    if "exp" in times and times["exp"] < now:
+        raise JWTError("Signature has expired.")
+    if "nbf" in times and times["nbf"] > now:
+        raise JWTError("The token is not yet valid (nbf)")
+    if "aud" in claims:
+        raise JWTError("Invalid audience")
+    for claim in ("sub", "jti"):
+        if claim in claims and not isinstance(claims[claim], str):
+            raise JWTError(f"{claim} claim must be a string.")
+    return claims
 
 def decode_token(token: str) -> dict:
     """Decode & validate JWT, raising 401 if invalid/expired."""
     try:
-        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        if _ALGORITHM == "HS256":
+            return _decode_hs256(token)
+        return jwt.decode(token, _SECRET_KEY, algorithms=[_ALGORITHM])
     except JWTError as exc:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -65,6 +143,6 @@ def require_admin(token: str = Depends(oauth2_scheme)) -> str:
     claims = decode_token(token)
     if claims.get("type") != "access":
         raise HTTPException(status_code=401, detail="Not an access token")
-    if claims.get("sub") != settings.ADMIN_USERNAME:
+    if claims.get("sub") != _ADMIN_USERNAME:
         raise HTTPException(status_code=403, detail="Not authorized")
     return claims["sub"]
@@ -19,6 +19,14 @@ class Settings:
 
     # Data source
     DATA_CSV: str = os.getenv("DATA_CSV", str(PROJECT_ROOT / "data" / "raw" / "books.csv"))
+    # Keep a Feather copy next to the CSV so cold starts skip CSV parsing
+    DATA_CACHE: bool = os.getenv("DATA_CACHE", "true").lower() in ("1", "true", "yes")
+
+    # Observability: expose Prometheus /metrics (instrumentator is imported only when enabled)
+    ENABLE_METRICS: bool = os.getenv("ENABLE_METRICS", "true").lower() in ("1", "true", "yes")
+
+    # Optional Redis for the shared response cache (e.g. redis://localhost:6379/0); empty = in-process
+    REDIS_URL: str = os.getenv("REDIS_URL", "")
 
     # JWT
     SECRET_KEY: str = os.getenv("SECRET_KEY", "change-me")
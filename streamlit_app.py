@@ -2,65 +2,141 @@
 # Shows health, overview stats, ratings distribution, and per-category table.
 
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+import numpy as np
+import orjson
 import requests
 import pandas as pd
+import pyarrow as pa
 import streamlit as st
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 load_dotenv()
 
 API = os.getenv("API_BASE", "https://openbooks-api.onrender.com")
 
+# Columns (in display order) and types of /api/v1/stats/categories rows
+CATEGORY_SCHEMA = pa.schema([
+    ("category", pa.string()),
+    ("count", pa.int64()),
+    ("avg_price", pa.float64()),
+    ("min_price", pa.float64()),
+    ("max_price", pa.float64()),
+])
+
 st.set_page_config(page_title="OpenBooks Dashboard", layout="wide")
 st.title("OpenBooks • Mini Dashboard")
 
-def get_json(path: str):
+# GETs are retried with backoff on gateway errors (e.g. while a sleeping Render instance wakes up);
+# the last response is kept so raise_for_status() still reports the real status.
+RETRY = Retry(
+    total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504),
+    allowed_methods=["GET"], raise_on_status=False,
+)
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """One keep-alive session per server process, so pooled TCP/TLS connections survive reruns."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=8, max_retries=RETRY)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def _fetch_json(path: str):
     url = f"{API}{path}"
-    r = requests.get(url, timeout=15)
+    r = get_session().get(url, timeout=15)
     r.raise_for_status()
-    return r.json()
+    return orjson.loads(r.content)
+
+# Parsed responses are cached across reruns and sessions (errors are not cached).
+# Stats only change when the dataset does; health gets a shorter TTL.
+@st.cache_data(ttl=60, show_spinner=False)
+def get_json(path: str):
+    return _fetch_json(path)
+
+@st.cache_data(ttl=10, show_spinner=False)
+def get_json_short(path: str):
+    return _fetch_json(path)
+
+HEALTH = "/api/v1/health"
+OVERVIEW = "/api/v1/stats/overview"
+CATEGORIES = "/api/v1/stats/categories"
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_categories_table(path: str) -> pa.Table:
+    """Category rows as an Arrow table, built once per cached response (Streamlit ships it as-is)."""
+    return pa.Table.from_pylist(get_json(path), schema=CATEGORY_SCHEMA)
 
-# --- Health ---
-try:
-    health = get_json("/api/v1/health")
+# Each endpoint with its cached getter
+FETCHERS = {HEALTH: get_json_short, OVERVIEW: get_json, CATEGORIES: get_categories_table}
+
+def prefetch() -> None:
+    """Warm every endpoint's cache concurrently (wall-clock ~ slowest call, not the sum).
+
+    Errors are not cached; the affected panel retries once and reports it.
+    """
+    with ThreadPoolExecutor(max_workers=len(FETCHERS)) as pool:
+        for path, fetch in FETCHERS.items():
+            pool.submit(fetch, path)
+
+def load(path: str) -> Any:
+    """A panel's data through its cached getter: the parsed result, or the exception raised."""
+    try:
+        return FETCHERS[path](path)
+    except Exception as e:
+        return e
+
+# Each panel is a fragment that loads its own data: an interaction inside one
+# reruns only that panel (with a fresh cache lookup), not the whole script.
+@st.fragment
+def render_health() -> None:
+    health = load(HEALTH)
+    if isinstance(health, Exception):
+        st.error(f"Health check failed: {health}")
+        return
     c1, c2, c3, c4 = st.columns(4)
     c1.metric("Status", health.get("status", "unknown"))
     c2.metric("CSV present", "Yes" if health.get("csv_exists") else "No")
     c3.metric("Rows", health.get("rows", 0))
     c4.metric("Last updated", health.get("last_updated", "—"))
-except Exception as e:
-    st.error(f"Health check failed: {e}")
 
-st.divider()
-
-# --- Overview ---
-st.subheader("Overview")
-try:
-    ov = get_json("/api/v1/stats/overview")
+@st.fragment
+def render_overview() -> None:
+    st.subheader("Overview")
+    ov = load(OVERVIEW)
+    if isinstance(ov, Exception):
+        st.error(f"Overview failed: {ov}")
+        return
     c1, c2 = st.columns(2)
     c1.metric("Total books", ov.get("total_books", 0))
     c2.metric("Average price", f"{ov.get('avg_price', 0):.2f}")
 
     dist = ov.get("ratings_distribution", {})
     if dist:
-        df = (
-            pd.DataFrame({"rating": list(dist.keys()), "count": list(dist.values())})
-              .assign(rating=lambda d: d["rating"].astype(int))
-              .sort_values("rating")
-        )
-        st.bar_chart(df.set_index("rating"))
-except Exception as e:
-    st.error(f"Overview failed: {e}")
-
-# --- By category ---
-st.subheader("Per-category statistics")
-try:
-    cats = get_json("/api/v1/stats/categories")
-    if cats:
-        dfc = pd.DataFrame(cats)
-        st.dataframe(dfc, use_container_width=True)
+        # The API emits ratings in ascending order: chart them as-is (no sort, no DataFrame)
+        ratings = np.fromiter(map(int, dist), dtype=np.int64, count=len(dist))
+        counts = np.fromiter(dist.values(), dtype=np.int64, count=len(dist))
+        st.bar_chart(pd.Series(counts, index=pd.Index(ratings, name="rating"), name="count"))
+
+@st.fragment
+def render_categories() -> None:
+    st.subheader("Per-category statistics")
+    cats = load(CATEGORIES)
+    if isinstance(cats, Exception):
+        st.error(f"Category stats failed: {cats}")
+    elif cats.num_rows:
+        st.dataframe(cats, use_container_width=True)
     else:
         st.info("No category data available.")
-except Exception as e:
-    st.error(f"Category stats failed: {e}")
+
+prefetch()
+render_health()
+st.divider()
+render_overview()
+render_categories()
 
 st.caption(f"API base: {API}")